@@ -2,19 +2,40 @@
 from __future__ import annotations
 
 import argparse
+import os
+import re
 import sys
-from dataclasses import dataclass
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from typing import Deque, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
 
 import chromadb
+import numpy as np
 from chromadb.utils import embedding_functions
 
+from chunk_text_numba import line_windows
 from cli_helpers import build_ingest_parser, parse_extensions
 
 
-@dataclass
-class Chunk:
+# Large read buffer so each file is pulled in with a handful of read() calls
+# instead of one per filesystem block.
+READ_BUFFER_BYTES = 128 * 1024
+EMBEDDINGS = embedding_functions.DefaultEmbeddingFunction()
+MAX_INFLIGHT_UPSERTS = 2
+# Line boundaries str.splitlines recognises besides "\n". The substring checks
+# are far cheaper than a regex scan, and almost no file contains any of them.
+_LINE_BREAK_CHARS = ("\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+_LINE_BREAKS = re.compile("\r\n?|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+FAST_INGEST_PRAGMAS = (
+    "journal_mode=off",
+    "synchronous=off",
+    "temp_store=memory",
+    "locking_mode=exclusive",
+)
+
+
+class Chunk(NamedTuple):
     """Small wrapper for a code chunk plus the metadata needed for retrieval."""
 
     doc_id: str
@@ -22,6 +43,63 @@ class Chunk:
     metadata: Dict[str, str]
 
 
+def _bucket_extensions(extensions: Sequence[str]) -> Dict[int, FrozenSet[str]]:
+    """Group extensions by length so most non-matching suffixes are rejected by length alone."""
+
+    buckets: Dict[int, set] = defaultdict(set)
+    for ext in extensions:
+        buckets[len(ext)].add(ext.lower())
+    return {length: frozenset(exts) for length, exts in buckets.items()}
+
+
+def _walk(
+    root: str,
+    ext_buckets: Dict[int, FrozenSet[str]],
+    include_hidden: bool,
+    max_bytes: float,
+) -> Iterator[str]:
+    """Depth-first os.scandir walk yielding paths of files that pass every filter.
+
+    Hidden directories are pruned instead of being descended into, and the
+    extension check runs on the bare file name before any stat() call.
+    Symlinked files are indexed like regular files; symlinked directories are
+    not descended into, which keeps the walk free of cycles.
+    """
+
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if not include_hidden and name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+                if ext_buckets:
+                    dot = name.rfind(".")
+                    if dot <= 0:
+                        continue
+                    bucket = ext_buckets.get(len(name) - dot)
+                    if bucket is None or name[dot:].lower() not in bucket:
+                        continue
+                # DirEntry caches the result, and for regular files on Windows it
+                # comes with the directory listing; symlinks report their target.
+                try:
+                    size = entry.stat().st_size
+                except OSError:
+                    continue
+                if size > max_bytes:
+                    continue
+                yield entry.path
+
+
 def iter_code_files(
     root: Path,
     extensions: Sequence[str],
@@ -31,52 +109,63 @@ def iter_code_files(
     """Yield files under root that match extension, visibility, and size filters."""
 
     max_bytes = max_file_mb * 1024 * 1024
-    for path in root.rglob("*"):
-        if not path.is_file():
-            continue
-        relative_parts = path.relative_to(root).parts
-        if not include_hidden and any(part.startswith(".") for part in relative_parts):
-            continue
-        if extensions and path.suffix.lower() not in extensions:
-            continue
-        try:
-            if path.stat().st_size > max_bytes:
-                continue
-        except OSError:
-            continue
-        yield path
+    for path in _walk(str(root), _bucket_extensions(extensions), include_hidden, max_bytes):
+        yield Path(path)
 
 
-def chunk_text(
-    text: str,
-    chunk_lines: int,
-    chunk_overlap: int,
-) -> Iterator[Tuple[str, int, int]]:
-    """Split text into overlapping windows and report each chunk with line numbers."""
-    lines = text.splitlines()
-    if not lines:
-        return
-    step = max(1, chunk_lines - chunk_overlap)
-    start = 0
-    while start < len(lines):
-        end = min(len(lines), start + chunk_lines)
-        chunk = "\n".join(lines[start:end]).strip()
-        if chunk:
-            yield chunk, start + 1, end
-        start += step
+Batch = Tuple[List[str], List[str], List[Dict[str, str]]]
+
+
+def batched(iterable: Iterable[Chunk], size: int) -> Iterator[Batch]:
+    """Group chunks into (ids, documents, metadatas) lists ready for bulk upserts."""
 
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, str]] = []
+    for doc_id, document, metadata in iterable:
+        ids.append(doc_id)
+        documents.append(document)
+        metadatas.append(metadata)
+        if len(ids) >= size:
+            yield ids, documents, metadatas
+            ids, documents, metadatas = [], [], []
+    if ids:
+        yield ids, documents, metadatas
 
-def batched(iterable: Iterable[Chunk], size: int) -> Iterator[List[Chunk]]:
-    """Group an iterable of chunks into fixed-size lists for bulk upserts."""
 
-    batch: List[Chunk] = []
-    for item in iterable:
-        batch.append(item)
-        if len(batch) >= size:
-            yield batch
-            batch = []
-    if batch:
-        yield batch
+def _read_file(path: Path) -> bytes | None:
+    """Read a source file's raw bytes, reporting (and skipping) unreadable files."""
+
+    try:
+        with open(path, "rb", buffering=READ_BUFFER_BYTES) as handle:
+            return handle.read()
+    except OSError as exc:
+        print(f"Skipping {path}: {exc}", file=sys.stderr)
+        return None
+
+
+def _chunk_file(raw: bytes, chunk_lines: int, chunk_overlap: int) -> List[Tuple[str, int, int]]:
+    """Split file bytes into overlapping line windows and report each chunk with line numbers.
+
+    The file is decoded (ignoring invalid UTF-8) and every line boundary
+    recognised by str.splitlines is rewritten to a single "\n", so line numbers
+    and chunk text match splitting the decoded file with splitlines and
+    re-joining each window with "\n". Window boundaries are then found on the
+    re-encoded buffer; newlines never occur inside a UTF-8 multi-byte sequence,
+    so each window decodes on its own.
+    """
+
+    text = raw.decode("utf-8", "ignore")
+    if any(char in text for char in _LINE_BREAK_CHARS):
+        text = _LINE_BREAKS.sub("\n", text)
+    data = text.encode("utf-8")
+    windows = line_windows(np.frombuffer(data, dtype=np.uint8), chunk_lines, chunk_overlap)
+    chunks: List[Tuple[str, int, int]] = []
+    for start_byte, end_byte, start_line, end_line in windows.tolist():
+        chunk = data[start_byte:end_byte].decode("utf-8").strip()
+        if chunk:
+            chunks.append((chunk, start_line, end_line))
+    return chunks
 
 
 def discover_chunks(
@@ -88,27 +177,48 @@ def discover_chunks(
     chunk_overlap: int,
     collection: str,
 ) -> Iterator[Chunk]:
-    """Walk the source tree and yield Chunk objects for each processed file."""
+    """Walk the source tree and yield Chunk objects for each processed file.
 
-    for path in iter_code_files(source_dir, extensions, include_hidden, max_file_mb):
-        try:
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        except OSError as exc:
-            print(f"Skipping {path}: {exc}", file=sys.stderr)
-            continue
-        relative = path.relative_to(source_dir).as_posix()
-        for idx, (chunk, start_line, end_line) in enumerate(
-            chunk_text(text, chunk_lines, chunk_overlap)
-        ):
-            doc_id = f"{relative}::{idx}"
-            metadata = {
-                "path": relative,
-                "start_line": str(start_line),
-                "end_line": str(end_line),
-                "source_dir": str(source_dir),
-                "collection": collection,
-            }
-            yield Chunk(doc_id=doc_id, document=chunk, metadata=metadata)
+    Files are read and chunked on a thread pool. File reads and the numba
+    line-window scan release the GIL, so they overlap across threads; decoding
+    and slicing the windows still run one thread at a time. At most a fixed
+    number of files are in flight at once, and results are yielded in walk order.
+    """
+
+    cpu_count = os.cpu_count() or 1
+    max_inflight = cpu_count * 4
+
+    def read_and_chunk(path: Path) -> List[Tuple[str, int, int]]:
+        raw = _read_file(path)
+        if raw is None:
+            return []
+        return _chunk_file(raw, chunk_lines, chunk_overlap)
+
+    with ThreadPoolExecutor(max_workers=cpu_count * 2) as readers:
+
+        pending: Deque[Tuple[Path, Future]] = deque()
+        # Keys shared by every chunk of this run, built once instead of per chunk.
+        shared_metadata = {"source_dir": str(source_dir), "collection": collection}
+
+        def drain_one() -> Iterator[Chunk]:
+            path, future = pending.popleft()
+            relative = path.relative_to(source_dir).as_posix()
+            for idx, (chunk, start_line, end_line) in enumerate(future.result()):
+                doc_id = f"{relative}::{idx}"
+                metadata = {
+                    "path": relative,
+                    "start_line": str(start_line),
+                    "end_line": str(end_line),
+                    **shared_metadata,
+                }
+                yield Chunk(doc_id, chunk, metadata)
+
+        for path in iter_code_files(source_dir, extensions, include_hidden, max_file_mb):
+            pending.append((path, readers.submit(read_and_chunk, path)))
+            if len(pending) >= max_inflight:
+                yield from drain_one()
+        while pending:
+            yield from drain_one()
 
 
 def ensure_collection(
@@ -126,14 +236,48 @@ def ensure_collection(
             print(f"Deleted existing collection '{collection_name}'.")
         except chromadb.errors.InvalidCollectionException:
             pass
-    default_embeddings = embedding_functions.DefaultEmbeddingFunction()
     return client.get_or_create_collection(
         name=collection_name,
-        embedding_function=default_embeddings,
+        embedding_function=EMBEDDINGS,
         metadata={"platform": "chromadb", "kind": "code-rag"},
     )
 
 
+def _apply_fast_ingest_pragmas(collection: chromadb.api.models.Collection.Collection) -> None:
+    """Disable SQLite journaling/fsync on the calling thread's Chroma connection.
+
+    Chroma keeps one SQLite connection per thread, so this must run on the
+    same thread that performs the upserts.
+    """
+
+    try:
+        conn = collection._client._sysdb._conn_pool.connect()
+    except AttributeError:
+        print(
+            "--fast-ingest is not supported by this ChromaDB version; continuing with defaults.",
+            file=sys.stderr,
+        )
+        return
+    for pragma in FAST_INGEST_PRAGMAS:
+        conn.execute(f"pragma {pragma}")
+
+
+def _upsert_batch(
+    collection: chromadb.api.models.Collection.Collection,
+    batch: Batch,
+    embeddings: Future,
+) -> None:
+    """Write one batch of chunks together with its precomputed embeddings."""
+
+    ids, documents, metadatas = batch
+    collection.upsert(
+        ids=ids,
+        documents=documents,
+        metadatas=metadatas,
+        embeddings=embeddings.result(),
+    )
+
+
 def handle_ingest(args: argparse.Namespace) -> None:
     """CLI handler that indexes a directory and writes chunks into ChromaDB."""
 
@@ -156,14 +300,24 @@ def handle_ingest(args: argparse.Namespace) -> None:
     )
     total = 0
     has_data = False
-    for batch in batched(chunk_iter, args.batch_size):
-        collection.upsert(
-            ids=[c.doc_id for c in batch],
-            documents=[c.document for c in batch],
-            metadatas=[c.metadata for c in batch],
-        )
-        total += len(batch)
-        has_data = True
+    # Embedding and upserting each run on their own worker thread, so the next
+    # batch is discovered and embedded while the previous one is committing.
+    # Chroma receives precomputed vectors and skips its own embedding step.
+    with ThreadPoolExecutor(max_workers=1) as embedder, ThreadPoolExecutor(
+        max_workers=1
+    ) as upserter:
+        if args.fast_ingest:
+            upserter.submit(_apply_fast_ingest_pragmas, collection).result()
+        pending: Deque[Future] = deque()
+        for batch in batched(chunk_iter, args.batch_size):
+            embeddings = embedder.submit(EMBEDDINGS, batch[1])
+            pending.append(upserter.submit(_upsert_batch, collection, batch, embeddings))
+            if len(pending) >= MAX_INFLIGHT_UPSERTS:
+                pending.popleft().result()
+            total += len(batch[0])
+            has_data = True
+        while pending:
+            pending.popleft().result()
     if not has_data:
         print("No chunks were produced; check your filters.")
         return
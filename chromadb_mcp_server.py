@@ -2,43 +2,284 @@
 from __future__ import annotations
 
 import asyncio
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Sequence, Tuple
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple, TypeVar
 
 import chromadb
+import numpy as np
+from chromadb.api import ClientAPI
 from chromadb.api.models.Collection import Collection
-from chromadb.utils import embedding_functions
 from mcp.server.fastmcp import FastMCP
 
 from cli_helpers import DEFAULT_COLLECTION, DEFAULT_DB_DIR
-from query_tool import format_context, simple_summary
+from list_chroma_rows import iter_row_pages
+from query_tool import EMBEDDINGS, format_context, simple_summary
 
 
 mcp = FastMCP("chromadb-code-rag")
-EMBEDDINGS = embedding_functions.DefaultEmbeddingFunction()
+_T = TypeVar("_T")
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed time-to-live."""
+
+    def __init__(self, capacity: int = 512, ttl: float = 300.0) -> None:
+        self.capacity = capacity
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, stamp: float | None = None) -> None:
+        """Store value; ``stamp`` back-dates the entry so it expires with its source."""
+
+        with self._lock:
+            now = time.monotonic()
+            self._data[key] = (now if stamp is None else stamp, value)
+            self._data.move_to_end(key)
+            while self._data:
+                oldest_key, (stamp, _) = next(iter(self._data.items()))
+                if now - stamp < self.ttl and len(self._data) <= self.capacity:
+                    break
+                del self._data[oldest_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "ttl_seconds": int(self.ttl),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class _SemanticScope:
+    """Embeddings, insertion times and results for one (db_dir, collection, top_k)."""
+
+    __slots__ = ("matrix", "stamps", "results", "filled", "next_slot")
+
+    def __init__(self, dim: int, rows: int) -> None:
+        self.matrix = np.zeros((rows, dim), dtype=np.float32)
+        self.stamps = np.full(rows, -np.inf)
+        self.results: List[Any] = [None] * rows
+        self.filled = 0
+        self.next_slot = 0
+
+
+class _SemanticCache:
+    """Reuse results for questions whose embeddings are nearly identical.
+
+    Each (db_dir, collection, top_k) scope keeps normalized question embeddings
+    next to their results; a lookup is one matrix-vector product over the
+    stored rows. Rows are allocated on demand (doubling up to ``capacity``),
+    entries older than ``ttl`` seconds are ignored, the oldest slot is
+    overwritten once a scope is full, and only the ``max_scopes`` most recently
+    used scopes are kept.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 512,
+        threshold: float = 0.97,
+        ttl: float = 300.0,
+        max_scopes: int = 32,
+        initial_rows: int = 16,
+    ) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self.initial_rows = min(initial_rows, capacity)
+        self.hits = 0
+        self.misses = 0
+        self._scopes: "OrderedDict[Hashable, _SemanticScope]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(array))
+        return array / norm if norm else array
+
+    def get(self, scope: Hashable, vector: Sequence[float]) -> Tuple[Any, float] | None:
+        """Return (result, insertion time) of the closest live entry, or None."""
+
+        query = self._normalize(vector)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is not None and entry.filled:
+                self._scopes.move_to_end(scope)
+                rows = entry.filled
+                sims = entry.matrix[:rows] @ query
+                expired = time.monotonic() - entry.stamps[:rows] >= self.ttl
+                if expired.any():
+                    sims[expired] = -np.inf
+                    for slot in np.flatnonzero(expired):
+                        entry.results[slot] = None
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self.hits += 1
+                    return entry.results[best], float(entry.stamps[best])
+            self.misses += 1
+            return None
+
+    def set(self, scope: Hashable, vector: Sequence[float], value: Any) -> None:
+        query = self._normalize(vector)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                if len(self._scopes) >= self.max_scopes:
+                    self._scopes.popitem(last=False)
+                entry = self._scopes[scope] = _SemanticScope(query.shape[0], self.initial_rows)
+            self._scopes.move_to_end(scope)
+            rows = entry.matrix.shape[0]
+            if entry.filled == rows and rows < self.capacity:
+                grown = min(self.capacity, rows * 2)
+                matrix = np.zeros((grown, entry.matrix.shape[1]), dtype=np.float32)
+                matrix[:rows] = entry.matrix
+                entry.matrix = matrix
+                entry.stamps = np.concatenate([entry.stamps, np.full(grown - rows, -np.inf)])
+                entry.results.extend([None] * (grown - rows))
+                entry.next_slot = rows
+                rows = grown
+            slot = entry.next_slot
+            entry.matrix[slot] = query
+            entry.stamps[slot] = time.monotonic()
+            entry.results[slot] = value
+            entry.filled = min(rows, entry.filled + 1)
+            entry.next_slot = (slot + 1) % rows
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "scopes": len(self._scopes),
+                "max_scopes": self.max_scopes,
+                "size": sum(entry.filled for entry in self._scopes.values()),
+                "capacity_per_scope": self.capacity,
+                "ttl_seconds": int(self.ttl),
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_QUERY_CACHE = _TTLCache(capacity=512, ttl=300.0)
+# Short TTL so clients polling list_collections do not re-count every collection.
+_LIST_CACHE = _TTLCache(capacity=32, ttl=5.0)
+# Cosine similarity above which two questions are treated as the same query.
+SEMANTIC_CACHE_THRESHOLD = 0.97
+_SEMANTIC_CACHE = _SemanticCache(capacity=512, threshold=SEMANTIC_CACHE_THRESHOLD, ttl=_QUERY_CACHE.ttl)
+
+
+# PersistentClient and Collection handles are reused across tool calls so the
+# SQLite connections and loaded HNSW indexes stay warm.
+_CLIENTS: Dict[str, ClientAPI] = {}
+_COLLECTIONS: Dict[Tuple[str, str], Collection] = {}
+_CLIENT_LOCK = threading.Lock()
 
 
 def _resolve_db_dir(db_dir: str) -> Path:
     return Path(db_dir).expanduser().resolve()
 
 
-def _get_collection(db_dir: str, collection_name: str) -> Collection:
+def _client(path: Path) -> ClientAPI:
+    """Return the shared PersistentClient for a resolved database directory."""
+
+    key = str(path)
+    with _CLIENT_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = chromadb.PersistentClient(path=key)
+        return client
+
+
+def _get_collection(db_dir: str, collection_name: str, create: bool = True) -> Collection:
     path = _resolve_db_dir(db_dir)
-    path.mkdir(parents=True, exist_ok=True)
-    client = chromadb.PersistentClient(path=str(path))
-    return client.get_or_create_collection(
-        name=collection_name,
-        embedding_function=EMBEDDINGS,
-    )
+    key = (str(path), collection_name)
+    with _CLIENT_LOCK:
+        collection = _COLLECTIONS.get(key)
+    if collection is not None:
+        return collection
+    if create:
+        path.mkdir(parents=True, exist_ok=True)
+        collection = _client(path).get_or_create_collection(
+            name=collection_name,
+            embedding_function=EMBEDDINGS,
+        )
+    else:
+        collection = _client(path).get_collection(
+            name=collection_name,
+            embedding_function=EMBEDDINGS,
+        )
+    with _CLIENT_LOCK:
+        _COLLECTIONS[key] = collection
+    return collection
+
+
+def _forget_collection(db_dir: str, collection_name: str) -> None:
+    """Drop a memoized collection handle, e.g. after it was deleted and re-ingested."""
+
+    with _CLIENT_LOCK:
+        _COLLECTIONS.pop((str(_resolve_db_dir(db_dir)), collection_name), None)
+
+
+def _with_collection(
+    db_dir: str,
+    collection_name: str,
+    action: Callable[[Collection], _T],
+    create: bool = True,
+) -> _T:
+    """Run ``action`` on the memoized collection handle, retrying once on failure.
+
+    A cached handle goes stale when another process deletes and re-creates the
+    collection (e.g. ``chromadb_code_rag.py --reset``); the handle is then
+    dropped and ``action`` runs again against a freshly looked-up one.
+    """
+
+    collection = _get_collection(db_dir, collection_name, create)
+    try:
+        return action(collection)
+    except Exception:
+        _forget_collection(db_dir, collection_name)
+    return action(_get_collection(db_dir, collection_name, create))
+
+
+def invalidate_list_collections() -> None:
+    """Drop cached list_collections results, e.g. after a tool writes to the database."""
+
+    _LIST_CACHE.clear()
 
 
 def _list_collections_sync(db_dir: str) -> List[Dict[str, str]]:
     path = _resolve_db_dir(db_dir)
+    cached = _LIST_CACHE.get(str(path))
+    if cached is not None:
+        return cached
     if not path.exists():
         return []
-    client = chromadb.PersistentClient(path=str(path))
     data: List[Dict[str, str]] = []
-    for collection in client.list_collections():
+    for collection in _client(path).list_collections():
         try:
             count = collection.count()
         except Exception:
@@ -52,30 +293,165 @@ def _list_collections_sync(db_dir: str) -> List[Dict[str, str]]:
                 f"{key}={value}" for key, value in collection.metadata.items()
             )
         data.append(entry)
+    _LIST_CACHE.set(str(path), data)
     return data
 
 
-def _query_collection_sync(
+def _lookup_query_cache(
     question: str,
     db_dir: str,
     collection_name: str,
     top_k: int,
-) -> List[Tuple[Dict[str, str], str, float]]:
-    collection = _get_collection(db_dir, collection_name)
-    results = collection.query(
-        query_texts=[question],
-        n_results=top_k,
-        include=["metadatas", "documents", "distances"],
+) -> Tuple[List[Tuple[Dict[str, str], str, float]] | None, Any]:
+    """Return (cached contexts, question embedding); the embedding is None on an exact hit."""
+
+    scope = (str(_resolve_db_dir(db_dir)), collection_name, top_k)
+    cache_key = (question, *scope)
+    cached = _QUERY_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, None
+
+    query_embedding = EMBEDDINGS([question])[0]
+    hit = _SEMANTIC_CACHE.get(scope, query_embedding)
+    if hit is None:
+        return None, query_embedding
+    cached, stored_at = hit
+    # Keep the original insertion time so the TTL still counts from the real query.
+    _QUERY_CACHE.set(cache_key, cached, stamp=stored_at)
+    return cached, query_embedding
+
+
+def _remember_query(
+    question: str,
+    db_dir: str,
+    collection_name: str,
+    top_k: int,
+    query_embedding: Any,
+    contexts: List[Tuple[Dict[str, str], str, float]],
+) -> None:
+    # Empty results usually mean the collection has not been ingested yet;
+    # caching them would keep answering "No matches found" after ingestion.
+    if not contexts:
+        return
+    scope = (str(_resolve_db_dir(db_dir)), collection_name, top_k)
+    _QUERY_CACHE.set((question, *scope), contexts)
+    _SEMANTIC_CACHE.set(scope, query_embedding, contexts)
+
+
+def _query_batch_sync(
+    db_dir: str,
+    collection_name: str,
+    top_k: int,
+    query_embeddings: Sequence[Any],
+) -> List[List[Tuple[Dict[str, str], str, float]]]:
+    """Run one collection.query for several question embeddings at once."""
+
+    vectors = [np.asarray(vector, dtype=np.float32).tolist() for vector in query_embeddings]
+    results = _with_collection(
+        db_dir,
+        collection_name,
+        lambda collection: collection.query(
+            query_embeddings=vectors,
+            n_results=top_k,
+            include=["metadatas", "documents", "distances"],
+        ),
     )
-    metadatas: Sequence[Dict[str, str]] = results.get("metadatas", [[]])[0] or []
-    documents: Sequence[str] = results.get("documents", [[]])[0] or []
-    distances: Sequence[float] = results.get("distances", [[]])[0] or []
+    count = len(query_embeddings)
+    all_metadatas = results.get("metadatas") or [[]] * count
+    all_documents = results.get("documents") or [[]] * count
+    all_distances = results.get("distances") or [[]] * count
+
+    batches: List[List[Tuple[Dict[str, str], str, float]]] = []
+    for metadatas, documents, distances in zip(all_metadatas, all_documents, all_distances):
+        contexts: List[Tuple[Dict[str, str], str, float]] = []
+        for metadata, document, distance in zip(metadatas or [], documents or [], distances or []):
+            contexts.append((metadata or {}, document or "", float(distance) if distance is not None else 0.0))
+        batches.append(contexts)
+    return batches
+
+
+class _QueryCoalescer:
+    """Merge query_codebase calls that arrive close together into one Chroma query.
+
+    Requests are grouped by (db_dir, collection, top_k). The background flusher
+    waits ``window`` seconds after the first pending request (or until
+    ``max_batch`` requests are queued) and then issues one batched
+    ``collection.query`` per group, resolving each caller's future with its slice.
+    """
+
+    def __init__(self, window: float = 0.01, max_batch: int = 8) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Tuple[str, str, int], Any, asyncio.Future]] = []
+        self._has_pending: asyncio.Event | None = None
+        self._full: asyncio.Event | None = None
+        self._flusher: asyncio.Task | None = None
+        # The event loop only keeps weak references to tasks, so hold on to them.
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        db_dir: str,
+        collection_name: str,
+        top_k: int,
+        query_embedding: Any,
+    ) -> List[Tuple[Dict[str, str], str, float]]:
+        loop = asyncio.get_running_loop()
+        if self._flusher is None or self._flusher.done():
+            self._has_pending = asyncio.Event()
+            self._full = asyncio.Event()
+            self._flusher = loop.create_task(self._flush_forever())
+        future: asyncio.Future = loop.create_future()
+        key = (str(_resolve_db_dir(db_dir)), collection_name, top_k)
+        self._pending.append((key, query_embedding, future))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _flush_forever(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            batch, self._pending = self._pending, []
+            self._has_pending.clear()
+            self._full.clear()
+            groups: Dict[Tuple[str, str, int], List[Tuple[Any, asyncio.Future]]] = {}
+            for key, query_embedding, future in batch:
+                groups.setdefault(key, []).append((query_embedding, future))
+            for key, entries in groups.items():
+                task = asyncio.create_task(self._run_group(key, entries))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    async def _run_group(
+        key: Tuple[str, str, int],
+        entries: List[Tuple[Any, asyncio.Future]],
+    ) -> None:
+        db_dir, collection_name, top_k = key
+        try:
+            results = await asyncio.to_thread(
+                _query_batch_sync,
+                db_dir,
+                collection_name,
+                top_k,
+                [query_embedding for query_embedding, _ in entries],
+            )
+        except Exception as exc:
+            for _, future in entries:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), contexts in zip(entries, results):
+            if not future.done():
+                future.set_result(contexts)
+
 
-    contexts: List[Tuple[Dict[str, str], str, float]] = []
-    for metadata, document, distance in zip(metadatas, documents, distances):
-        clean_metadata = {key: str(value) for key, value in (metadata or {}).items() if value is not None}
-        contexts.append((clean_metadata, document or "", float(distance) if distance is not None else 0.0))
-    return contexts
+_QUERY_COALESCER = _QueryCoalescer()
 
 
 def _list_rows_sync(
@@ -85,25 +461,15 @@ def _list_rows_sync(
     offset: int,
     include_docs: bool,
 ) -> Tuple[int, List[Tuple[str, Dict[str, str], str | None]]]:
-    client = chromadb.PersistentClient(path=str(_resolve_db_dir(db_dir)))
-    collection = client.get_collection(name=collection_name)
-    total = collection.count()
-    include: List[str] = ["metadatas"]
-    if include_docs:
-        include.append("documents")
-    data = collection.get(limit=limit, offset=offset, include=include)
-    ids = data.get("ids", [])
-    metadatas = data.get("metadatas", [])
-    documents = data.get("documents", []) if include_docs else []
-    rows: List[Tuple[str, Dict[str, str], str | None]] = []
-    for idx, row_id in enumerate(ids):
-        metadata = metadatas[idx] if idx < len(metadatas) else {}
-        clean_metadata = {key: str(value) for key, value in (metadata or {}).items() if value is not None}
-        document = None
-        if include_docs and idx < len(documents):
-            document = documents[idx]
-        rows.append((row_id, clean_metadata, document))
-    return total, rows
+
+    def fetch(collection: Collection) -> Tuple[int, List[Tuple[str, Dict[str, str], str | None]]]:
+        total = collection.count()
+        rows: List[Tuple[str, Dict[str, str], str | None]] = []
+        for page in iter_row_pages(collection, limit, offset, include_docs):
+            rows.extend(page)
+        return total, rows
+
+    return _with_collection(db_dir, collection_name, fetch, create=False)
 
 
 def _format_rows_output(
@@ -171,13 +537,16 @@ async def query_codebase(
 
     _validate_positive("top_k", top_k)
     try:
-        contexts = await asyncio.to_thread(
-            _query_collection_sync,
+        contexts, query_embedding = await asyncio.to_thread(
+            _lookup_query_cache,
             question,
             db_dir,
             collection,
             top_k,
         )
+        if contexts is None:
+            contexts = await _QUERY_COALESCER.submit(db_dir, collection, top_k, query_embedding)
+            _remember_query(question, db_dir, collection, top_k, query_embedding, contexts)
     except Exception as exc:
         return f"Query failed: {exc}"
 
@@ -233,6 +602,25 @@ async def list_rows(
     return output
 
 
+@mcp.tool()
+async def cache_stats() -> str:
+    """Report hit/miss counters for the exact and semantic query caches."""
+
+    lines: List[str] = []
+    for title, stats in (
+        ("Query cache (exact match)", _QUERY_CACHE.stats()),
+        ("Query cache (semantic)", _SEMANTIC_CACHE.stats()),
+    ):
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups if lookups else 0.0
+        if lines:
+            lines.append("")
+        lines.append(f"{title}:")
+        lines.extend(f"- {key}: {value}" for key, value in stats.items())
+        lines.append(f"- hit_rate: {hit_rate:.1%}")
+    return "\n".join(lines)
+
+
 def main() -> None:
     mcp.run(transport="stdio")
 
@@ -0,0 +1,81 @@
+"""Compute overlapping line windows over raw file bytes.
+
+``line_windows`` scans a ``uint8`` buffer for ``\\n`` bytes and returns one
+``(start_byte, end_byte, start_line, end_line)`` row per window for
+``chromadb_code_rag._chunk_file``. Numba is optional: when it is installed
+the scan is JIT-compiled (cached on disk, and releasing the GIL while it runs),
+otherwise an equivalent vectorized NumPy implementation is used.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - depends on the environment
+    njit = None
+
+
+NEWLINE = 10
+
+
+def _line_windows_loop(buf: np.ndarray, chunk_lines: int, chunk_overlap: int) -> np.ndarray:
+    """Single-pass scan used as the Numba kernel."""
+
+    n = buf.shape[0]
+    newlines = 0
+    for i in range(n):
+        if buf[i] == NEWLINE:
+            newlines += 1
+    # line_starts[i] is the byte where line i begins; the entry after the last
+    # line sits one past its terminating newline (real or virtual).
+    line_starts = np.empty(newlines + 2, dtype=np.int64)
+    line_starts[0] = 0
+    k = 1
+    for i in range(n):
+        if buf[i] == NEWLINE:
+            line_starts[k] = i + 1
+            k += 1
+    if n > 0 and buf[n - 1] == NEWLINE:
+        line_count = newlines
+    else:
+        line_starts[k] = n + 1
+        line_count = newlines + 1
+
+    step = max(1, chunk_lines - chunk_overlap)
+    count = (line_count + step - 1) // step
+    windows = np.empty((count, 4), dtype=np.int64)
+    for w in range(count):
+        start = w * step
+        end = min(line_count, start + chunk_lines)
+        windows[w, 0] = line_starts[start]
+        windows[w, 1] = line_starts[end] - 1
+        windows[w, 2] = start + 1
+        windows[w, 3] = end
+    return windows
+
+
+def _line_windows_numpy(buf: np.ndarray, chunk_lines: int, chunk_overlap: int) -> np.ndarray:
+    """Vectorized fallback used when Numba is not installed."""
+
+    n = buf.shape[0]
+    parts = [np.zeros(1, dtype=np.int64), np.flatnonzero(buf == NEWLINE).astype(np.int64) + 1]
+    if n == 0 or buf[n - 1] != NEWLINE:
+        parts.append(np.array([n + 1], dtype=np.int64))
+    line_starts = np.concatenate(parts)
+    line_count = line_starts.shape[0] - 1
+
+    step = max(1, chunk_lines - chunk_overlap)
+    starts = np.arange(0, line_count, step, dtype=np.int64)
+    ends = np.minimum(starts + chunk_lines, line_count)
+    return np.stack([line_starts[starts], line_starts[ends] - 1, starts + 1, ends], axis=1)
+
+
+if njit is not None:
+    # nogil lets reader threads in discover_chunks run the scan concurrently;
+    # the kernel only touches NumPy arrays, so no Python objects are involved.
+    line_windows = njit(cache=True, nogil=True)(_line_windows_loop)
+    # Compile on import so the first real file does not pay the JIT cost.
+    line_windows(np.zeros(1, dtype=np.uint8), 1, 0)
+else:
+    line_windows = _line_windows_numpy
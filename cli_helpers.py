@@ -107,14 +107,22 @@ def build_ingest_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "--batch-size",
         type=positive_int,
-        default=64,
-        help="How many chunks to upsert per call (default: 64).",
+        default=200,
+        help="How many chunks to upsert per call (default: 200).",
     )
     parser.add_argument(
         "--reset",
         action="store_true",
         help="Drop the existing collection before ingesting.",
     )
+    parser.add_argument(
+        "--fast-ingest",
+        action="store_true",
+        help=(
+            "Turn off SQLite journaling and fsync while ingesting. Much faster for bulk loads, "
+            "but a crash or power loss mid-run can corrupt the database; re-run with --reset if that happens."
+        ),
+    )
 
     return parser
 
@@ -3,13 +3,30 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
-from typing import Sequence
+from typing import Iterator, List, Sequence, Tuple
 
 import chromadb
 
 from cli_helpers import DEFAULT_COLLECTION, DEFAULT_DB_DIR
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+ROW_PAGE_SIZE = 500
+
+
+def _dumps(payload: object) -> str:
+    """Serialize payload as indented JSON, using orjson when it is installed."""
+
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(payload, indent=2)
+
 
 def build_parser() -> argparse.ArgumentParser:
     """Build CLI for listing stored rows in a Chroma collection."""
@@ -65,6 +82,42 @@ def ensure_collection(db_dir: Path, collection_name: str):
         raise SystemExit(f"Collection '{collection_name}' was not found in {db_dir}.") from exc
 
 
+def iter_row_pages(
+    collection,
+    limit: int,
+    offset: int,
+    include_docs: bool,
+    page_size: int = ROW_PAGE_SIZE,
+) -> Iterator[List[Tuple[str, dict, str | None]]]:
+    """Fetch up to ``limit`` rows starting at ``offset`` in pages of ``page_size``.
+
+    Each page is yielded as a list of ``(id, metadata, document)`` tuples as soon
+    as it arrives, so callers never hold more than one page in memory. Documents
+    are only requested when ``include_docs`` is set.
+    """
+
+    include = ["metadatas", "documents"] if include_docs else ["metadatas"]
+    cursor = offset
+    remaining = limit
+    while remaining > 0:
+        size = min(page_size, remaining)
+        data = collection.get(limit=size, offset=cursor, include=include)
+        ids = data.get("ids") or []
+        metadatas = data.get("metadatas") or []
+        documents = (data.get("documents") or []) if include_docs else []
+        page = []
+        for idx, row_id in enumerate(ids):
+            metadata = metadatas[idx] if idx < len(metadatas) else {}
+            document = documents[idx] if idx < len(documents) else None
+            page.append((row_id, metadata or {}, document))
+        if page:
+            yield page
+        if len(ids) < size:
+            return
+        cursor += size
+        remaining -= size
+
+
 def format_row(idx: int, row_id: str, metadata: dict, document: str | None) -> str:
     """Format a single row for console output."""
 
@@ -88,19 +141,20 @@ def list_rows(args: argparse.Namespace) -> None:
 
     collection = ensure_collection(Path(args.db_dir), args.collection)
     total = collection.count()
-    include: Sequence[str] = ["metadatas"]
-    if args.show_docs:
-        include = ["metadatas", "documents"]
-    try:
-        data = collection.get(limit=args.limit, offset=args.offset, include=list(include))
-    except ValueError as exc:
-        raise SystemExit(f"Failed to fetch rows: {exc}") from exc
-
-    ids = data.get("ids", [])
-    metadatas = data.get("metadatas", [])
-    documents = data.get("documents", [])
+    pages = iter_row_pages(collection, args.limit, args.offset, args.show_docs)
 
     if args.json:
+        ids: List[str] = []
+        metadatas: List[dict] = []
+        documents: List[str | None] = []
+        try:
+            for page in pages:
+                for row_id, metadata, document in page:
+                    ids.append(row_id)
+                    metadatas.append(metadata)
+                    documents.append(document)
+        except ValueError as exc:
+            raise SystemExit(f"Failed to fetch rows: {exc}") from exc
         payload = {
             "count": len(ids),
             "offset": args.offset,
@@ -109,20 +163,26 @@ def list_rows(args: argparse.Namespace) -> None:
             "metadatas": metadatas,
             "documents": documents if args.show_docs else None,
         }
-        print(json.dumps(payload, indent=2))
+        print(_dumps(payload))
         return
 
     print(f"Collection: {args.collection} (total rows: {total})")
-    if not ids:
+    separator = "-" * 40
+    idx = args.offset
+    try:
+        for page in pages:
+            # One write per page instead of two print() calls per row.
+            lines: List[str] = []
+            for row_id, metadata, document in page:
+                idx += 1
+                lines.append(format_row(idx, row_id, metadata, document))
+                lines.append(separator)
+            lines.append("")
+            sys.stdout.write("\n".join(lines))
+    except ValueError as exc:
+        raise SystemExit(f"Failed to fetch rows: {exc}") from exc
+    if idx == args.offset:
         print("No rows found for the given offset/limit.")
-        return
-
-    for rel_idx, row_id in enumerate(ids):
-        idx = args.offset + rel_idx + 1
-        metadata = metadatas[rel_idx] if metadatas else {}
-        document = documents[rel_idx] if args.show_docs and documents else None
-        print(format_row(idx, row_id, metadata, document))
-        print("-" * 40)
 
 
 def main(argv: Sequence[str] | None = None) -> None:
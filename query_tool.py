@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import argparse
+import json
 import textwrap
 from pathlib import Path
 from typing import Dict, List, Sequence, Tuple
@@ -9,10 +10,18 @@ from typing import Dict, List, Sequence, Tuple
 import chromadb
 from chromadb.utils import embedding_functions
 import requests
+from requests.adapters import HTTPAdapter
 
 from cli_helpers import build_query_parser
 
 
+EMBEDDINGS = embedding_functions.DefaultEmbeddingFunction()
+# Shared session so repeated Ollama calls reuse the same keep-alive connection.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+
+
 def format_context(metadata: Dict[str, str], document: str, distance: float | None, idx: int) -> str:
     """Pretty-print a retrieved chunk with filename, line range, and distance."""
 
@@ -86,17 +95,27 @@ def maybe_generate_with_ollama(
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
+        "stream": True,
         "options": {"num_predict": max_tokens},
     }
+    # Ollama streams newline-delimited JSON objects, each carrying a piece of the answer.
+    pieces: List[str] = []
     try:
-        response = requests.post(url, json=payload, timeout=120)
-        response.raise_for_status()
-    except requests.RequestException as exc:
+        with _SESSION.post(url, json=payload, timeout=120, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if "error" in data:
+                    raise SystemExit(f"Ollama at {url} returned an error: {data['error']}")
+                pieces.append(data.get("response", ""))
+                if data.get("done"):
+                    break
+    except (requests.RequestException, ValueError) as exc:
         raise SystemExit(f"Failed to contact Ollama at {url}: {exc}") from exc
 
-    data = response.json()
-    answer = data.get("response", "").strip()
+    answer = "".join(pieces).strip()
     return answer or "Ollama returned an empty response."
 
 
@@ -105,15 +124,15 @@ def handle_query(args: argparse.Namespace) -> None:
 
     db_dir = Path(args.db_dir).expanduser().resolve()
     client = chromadb.PersistentClient(path=str(db_dir))
-    default_embeddings = embedding_functions.DefaultEmbeddingFunction()
     collection = client.get_or_create_collection(
         name=args.collection,
-        embedding_function=default_embeddings,
+        embedding_function=EMBEDDINGS,
     )
 
     query = args.question
+    query_embedding = EMBEDDINGS([query])[0]
     results = collection.query(
-        query_texts=[query],
+        query_embeddings=[query_embedding],
         n_results=args.top_k,
         include=["metadatas", "documents", "distances"],
     )